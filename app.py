@@ -1,8 +1,11 @@
+import bisect
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
-from database import LibraryDB
+from database import LibraryDB, normalize_borrower_id
 from auth import Authentication
+from config import LIBRARY_CONFIG
+from table_cache import ColumnCache
 import tkinter.simpledialog as simpledialog
 
 class LibraryApp(tk.Tk):
@@ -41,8 +44,10 @@ class LibraryApp(tk.Tk):
         self.password_entry = ttk.Entry(self.login_window, width=25, show="*")
         self.password_entry.pack(pady=5)
         
-        ttk.Button(self.login_window, text="Login", 
-                  command=self.attempt_login, width=20).pack(pady=10)
+        self.login_button = ttk.Button(self.login_window, text="Login", 
+                  command=self.attempt_login, width=20)
+        self.login_button.pack(pady=10)
+        self.login_pending = False
         
         # Bind Enter key to login
         self.login_window.bind('<Return>', lambda e: self.attempt_login())
@@ -56,12 +61,33 @@ class LibraryApp(tk.Tk):
             messagebox.showwarning("Validation", "Please enter both username and password.")
             return
         
-        user = self.auth.login(username, password)
+        if self.login_pending:
+            return
+        
+        # Password verification runs the KDF on a worker thread; poll for the result
+        self.login_pending = True
+        self.login_button.config(text="Verifying...", state="disabled")
+        self.check_login(self.auth.login_async(username, password))
+    
+    def check_login(self, future):
+        """Finish a login once the worker has verified the password"""
+        if not future.done():
+            self.after(50, self.check_login, future)
+            return
+        
+        self.login_pending = False
+        try:
+            user = future.result()
+        except Exception as e:
+            self.login_button.config(text="Login", state="normal")
+            messagebox.showerror("Login Failed", f"Could not verify credentials: {e}")
+            return
         if user:
             self.login_window.destroy()
             self.current_user = user
             self.initialize_main_app()
         else:
+            self.login_button.config(text="Login", state="normal")
             messagebox.showerror("Login Failed", "Invalid username or password!")
     
     def initialize_main_app(self):
@@ -70,6 +96,7 @@ class LibraryApp(tk.Tk):
         self.create_widgets()
         self.refresh_books()
         self.refresh_issued()
+        self.load_borrowers()
         self.update_user_display()
     
     def style_setup(self):
@@ -122,6 +149,9 @@ class LibraryApp(tk.Tk):
         self.search_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.search_tab, text="🔍 Search & Export")
         
+        # Sortable/filterable tables, keyed by Treeview
+        self.tables = {}
+        
         # Build each tab
         self.build_main_tab()
         self.build_dashboard_tab()
@@ -165,6 +195,18 @@ class LibraryApp(tk.Tk):
         ttk.Label(issue_card, text="Borrower:").grid(row=2, column=0, sticky="w")
         self.borrower_entry = ttk.Entry(issue_card, width=24)
         self.borrower_entry.grid(row=2, column=1, sticky="w", pady=4)
+        self.borrower_entry.bind("<KeyRelease>", self.on_borrower_typed)
+        self.borrower_entry.bind("<Down>", self.focus_borrower_suggestions)
+        self.borrower_entry.bind("<Escape>", lambda e: self.hide_borrower_suggestions())
+        self.borrower_entry.bind("<FocusOut>", lambda e: self.after(100, self.on_borrower_focus_out))
+        self.borrower_lookup = None
+
+        # Autocomplete popup, placed under the entry without taking focus
+        self.borrower_suggestions = tk.Listbox(self, height=LIBRARY_CONFIG['borrower_suggestions'], 
+                                               exportselection=False, activestyle="none")
+        self.borrower_suggestions.bind("<ButtonRelease-1>", self.pick_borrower_suggestion)
+        self.borrower_suggestions.bind("<Return>", self.pick_borrower_suggestion)
+        self.borrower_suggestions.bind("<Escape>", lambda e: self.pick_borrower_suggestion(e, keep=True))
 
         ttk.Button(issue_card, text="Issue Book", command=self.issue_book, style="Accent.TButton").grid(row=3, column=0, columnspan=2, pady=(8, 0), sticky="ew")
 
@@ -185,7 +227,10 @@ class LibraryApp(tk.Tk):
         right.pack(side="left", fill="both", expand=True)
 
         # Books Table
-        ttk.Label(right, text="Books Collection", font=("Arial", 12, "bold")).pack(anchor="w", pady=(0, 6))
+        books_header = ttk.Frame(right)
+        books_header.pack(fill="x", pady=(0, 6))
+        ttk.Label(books_header, text="Books Collection", font=("Arial", 12, "bold")).pack(side="left")
+        books_filter = self.add_filter_box(books_header)
         cols = ("ID", "Title", "Author", "Year", "ISBN", "Copies")
         self.books_tree = ttk.Treeview(right, columns=cols, show="headings", selectmode="browse")
         for c in cols:
@@ -193,15 +238,20 @@ class LibraryApp(tk.Tk):
             self.books_tree.column(c, width=120)
         self.books_tree.pack(fill="both", expand=True)
         self.books_tree.bind("<<TreeviewSelect>>", self.on_book_select)
+        self.register_table(self.books_tree, cols, books_filter)
 
         # Issued Table
-        ttk.Label(right, text="Issued Books", font=("Arial", 12, "bold")).pack(anchor="w", pady=(10, 6))
+        issued_header = ttk.Frame(right)
+        issued_header.pack(fill="x", pady=(10, 6))
+        ttk.Label(issued_header, text="Issued Books", font=("Arial", 12, "bold")).pack(side="left")
+        issued_filter = self.add_filter_box(issued_header)
         issued_cols = ("IssueID", "BookID", "Title", "Borrower", "IssueDate", "ReturnDate")
         self.issued_tree = ttk.Treeview(right, columns=issued_cols, show="headings", selectmode="browse")
         for c in issued_cols:
             self.issued_tree.heading(c, text=c)
             self.issued_tree.column(c, width=140)
         self.issued_tree.pack(fill="both", expand=True)
+        self.register_table(self.issued_tree, issued_cols, issued_filter)
     
     def build_dashboard_tab(self):
         """New Analytics Dashboard"""
@@ -273,8 +323,11 @@ class LibraryApp(tk.Tk):
                   command=self.clear_search).pack(side="left")
         
         # Search Results
-        ttk.Label(search_tab, text="Search Results", 
-                 font=("Arial", 12, "bold")).pack(anchor="w", pady=(10, 5))
+        results_header = ttk.Frame(search_tab)
+        results_header.pack(fill="x", pady=(10, 5))
+        ttk.Label(results_header, text="Search Results", 
+                 font=("Arial", 12, "bold")).pack(side="left")
+        results_filter = self.add_filter_box(results_header)
         
         self.search_tree = ttk.Treeview(search_tab, 
                                        columns=("ID", "Title", "Author", "Year", "ISBN", "Copies"), 
@@ -283,6 +336,8 @@ class LibraryApp(tk.Tk):
             self.search_tree.heading(col, text=col)
             self.search_tree.column(col, width=100)
         self.search_tree.pack(fill="both", expand=True, pady=(0, 20))
+        self.register_table(self.search_tree, ("ID", "Title", "Author", "Year", "ISBN", "Copies"), 
+                            results_filter)
         
         # Export Section
         ttk.Label(search_tab, text="📤 Export Data", 
@@ -302,6 +357,108 @@ class LibraryApp(tk.Tk):
         entry.grid(row=row, column=1, sticky="w", pady=4)
         return entry
     
+    def add_filter_box(self, frame):
+        """Quick-filter entry packed to the right of a table heading"""
+        entry = ttk.Entry(frame, width=25)
+        entry.pack(side="right")
+        ttk.Label(frame, text="Filter:").pack(side="right", padx=(0, 6))
+        return entry
+    
+    # ===== SORTABLE TABLES =====
+    
+    def register_table(self, tree, columns, filter_entry):
+        """Back a Treeview with a column cache so sort and filter stay local"""
+        self.tables[tree] = {
+            'cache': ColumnCache(columns),
+            'sort_column': None,
+            'descending': False,
+            'filter': filter_entry,
+            'filter_text': "",  # Filter the tree currently shows
+            'pending': None  # Debounced after() id
+        }
+        for c in columns:
+            tree.heading(c, text=c, command=lambda c=c: self.sort_table(tree, c))
+        filter_entry.bind("<KeyRelease>", lambda e: self.on_filter_typed(tree))
+    
+    def on_filter_typed(self, tree):
+        """Redraw once typing pauses, so each keystroke doesn't rebuild the tree"""
+        table = self.tables[tree]
+        if table['pending']:
+            self.after_cancel(table['pending'])
+        table['pending'] = self.after(250, self.apply_filter, tree)
+    
+    def apply_filter(self, tree):
+        table = self.tables[tree]
+        table['pending'] = None
+        # Arrow keys, Shift etc. fire KeyRelease without changing the text
+        if table['filter'].get() != table['filter_text']:
+            self.render_table(tree)
+    
+    def sort_table(self, tree, column):
+        """Sort by a column header; clicking it again reverses the order"""
+        table = self.tables[tree]
+        if table['sort_column'] == column:
+            table['descending'] = not table['descending']
+        else:
+            table['sort_column'], table['descending'] = column, False
+        
+        for c in table['cache'].columns:
+            arrow = (" ▼" if table['descending'] else " ▲") if c == column else ""
+            tree.heading(c, text=c + arrow)
+        self.render_table(tree)
+    
+    def render_table(self, tree):
+        """Redraw a Treeview from its cache without touching the database"""
+        table = self.tables[tree]
+        table['filter_text'] = table['filter'].get()
+        tree.delete(*tree.get_children())
+        for values in table['cache'].view(table['sort_column'], table['descending'], 
+                                          table['filter_text']):
+            # The row key doubles as the item id, so upserts can find the item
+            tree.insert("", "end", iid=str(values[0]), values=values)
+    
+    def load_table(self, tree, rows):
+        self.tables[tree]['cache'].load(rows)
+        self.render_table(tree)
+    
+    def upsert_rows(self, tree, rows, existing_only=False):
+        """Apply local writes to a table's cache, moving only the affected items"""
+        table = self.tables[tree]
+        cache = table['cache']
+        for values in rows:
+            if existing_only:
+                if not cache.update(values):
+                    continue
+            else:
+                cache.upsert(values)
+            
+            iid = str(values[0])
+            index = cache.view_index(values[0], table['sort_column'], table['descending'], 
+                                     table['filter_text'])
+            if index is None:
+                if tree.exists(iid):
+                    tree.delete(iid)
+            elif tree.exists(iid):
+                # Detach first so index counts the other rows only, as view_index does
+                tree.item(iid, values=values)
+                tree.detach(iid)
+                tree.move(iid, "", index)
+            else:
+                tree.insert("", index, iid=iid, values=values)
+    
+    def book_values(self, b):
+        return (b["id"], b["title"], b["author"], b["year"], b["isbn"], b["copies"])
+    
+    def issue_values(self, i):
+        return_date = i["return_date"] if i["return_date"] else "Not Returned"
+        return (i["issue_id"], i["book_id"], i["title"], i["borrower"], 
+                i["issue_date"], return_date)
+    
+    def update_book_rows(self, book):
+        """Push a changed book into every table that shows it"""
+        self.upsert_rows(self.books_tree, [self.book_values(book)])
+        self.upsert_rows(self.search_tree, [self.book_values(book)], existing_only=True)
+    
     # ===== ENHANCED FUNCTIONALITIES =====
     
     def update_user_display(self):
@@ -382,17 +539,12 @@ class LibraryApp(tk.Tk):
             return
         
         results = self.db.search_books(search_term)
-        
-        # Clear previous results
-        for item in self.search_tree.get_children():
-            self.search_tree.delete(item)
+        if results is None:
+            messagebox.showerror("Error", "Search failed.")
+            return
+        self.load_table(self.search_tree, [self.book_values(book) for book in results])
         
         if results:
-            for book in results:
-                self.search_tree.insert("", "end", values=(
-                    book['id'], book['title'], book['author'], 
-                    book['year'], book['isbn'], book['copies']
-                ))
             messagebox.showinfo("Search Results", f"Found {len(results)} books matching '{search_term}'")
         else:
             messagebox.showinfo("Search Results", f"No books found matching '{search_term}'")
@@ -400,8 +552,7 @@ class LibraryApp(tk.Tk):
     def clear_search(self):
         """Clear search results"""
         self.search_entry.delete(0, tk.END)
-        for item in self.search_tree.get_children():
-            self.search_tree.delete(item)
+        self.load_table(self.search_tree, [])
     
     def export_books(self):
         """Export books to CSV"""
@@ -445,7 +596,8 @@ class LibraryApp(tk.Tk):
         if result:
             messagebox.showinfo("Success", f"Book '{title}' added successfully!")
             self.clear_form()
-            self.refresh_books()
+            self.update_book_rows({"id": result, "title": title, "author": author, 
+                                   "year": year, "isbn": isbn, "copies": copies})
             self.refresh_dashboard()  # Refresh analytics too
         else:
             messagebox.showerror("Error", "Failed to add book to database.")
@@ -458,24 +610,12 @@ class LibraryApp(tk.Tk):
         self.copies_spin.set(1)
 
     def refresh_books(self):
-        for r in self.books_tree.get_children():
-            self.books_tree.delete(r)
         books = self.db.get_all_books()
-        for b in books:
-            self.books_tree.insert("", "end", values=(
-                b["id"], b["title"], b["author"], b["year"], b["isbn"], b["copies"]
-            ))
+        self.load_table(self.books_tree, [self.book_values(b) for b in books])
 
     def refresh_issued(self):
-        for r in self.issued_tree.get_children():
-            self.issued_tree.delete(r)
         issued_books = self.db.get_all_issued_books()
-        for i in issued_books:
-            return_date = i["return_date"] if i["return_date"] else "Not Returned"
-            self.issued_tree.insert("", "end", values=(
-                i["issue_id"], i["book_id"], i["title"], i["borrower"], 
-                i["issue_date"], return_date
-            ))
+        self.load_table(self.issued_tree, [self.issue_values(i) for i in issued_books])
 
     def on_book_select(self, event):
         sel = self.books_tree.selection()
@@ -484,6 +624,77 @@ class LibraryApp(tk.Tk):
         book_id = self.books_tree.item(sel[0], "values")[0]
         self.sel_book_id_lbl.config(text=str(book_id))
 
+    def load_borrowers(self):
+        """Cache the borrower registry, sorted by ID, for local prefix lookups"""
+        # Sort here: bisect needs codepoint order, not the SQL collation's order
+        borrowers = sorted((b["borrower_id"], b["name"]) for b in self.db.get_all_borrowers())
+        self.borrower_ids = [borrower_id for borrower_id, _ in borrowers]
+        self.borrower_names = [name for _, name in borrowers]
+
+    def add_borrower(self, name):
+        borrower_id = normalize_borrower_id(name)
+        i = bisect.bisect_left(self.borrower_ids, borrower_id)
+        if i == len(self.borrower_ids) or self.borrower_ids[i] != borrower_id:
+            self.borrower_ids.insert(i, borrower_id)
+            self.borrower_names.insert(i, " ".join(name.split()))
+
+    def on_borrower_typed(self, event):
+        """Debounce autocomplete while the borrower name is being typed"""
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self.borrower_lookup:
+            self.after_cancel(self.borrower_lookup)
+        self.borrower_lookup = self.after(150, self.show_borrower_suggestions)
+
+    def show_borrower_suggestions(self):
+        self.borrower_lookup = None
+        prefix = normalize_borrower_id(self.borrower_entry.get())
+        matches = []
+        if prefix:
+            i = bisect.bisect_left(self.borrower_ids, prefix)
+            while (i < len(self.borrower_ids) and self.borrower_ids[i].startswith(prefix)
+                   and len(matches) < LIBRARY_CONFIG['borrower_suggestions']):
+                matches.append(self.borrower_names[i])
+                i += 1
+        if not matches:
+            self.hide_borrower_suggestions()
+            return
+
+        listbox = self.borrower_suggestions
+        listbox.delete(0, tk.END)
+        listbox.insert(tk.END, *matches)
+        listbox.config(height=len(matches))
+        entry = self.borrower_entry
+        listbox.place(x=entry.winfo_rootx() - self.winfo_rootx(), 
+                      y=entry.winfo_rooty() - self.winfo_rooty() + entry.winfo_height(), 
+                      width=entry.winfo_width())
+        listbox.lift()
+
+    def hide_borrower_suggestions(self):
+        self.borrower_suggestions.place_forget()
+
+    def focus_borrower_suggestions(self, event):
+        """Down arrow moves from the entry into the suggestion list"""
+        listbox = self.borrower_suggestions
+        if listbox.winfo_ismapped():
+            listbox.focus_set()
+            listbox.selection_clear(0, tk.END)
+            listbox.selection_set(0)
+            listbox.activate(0)
+        return "break"
+
+    def on_borrower_focus_out(self):
+        if self.focus_get() is not self.borrower_suggestions:
+            self.hide_borrower_suggestions()
+
+    def pick_borrower_suggestion(self, event, keep=False):
+        sel = self.borrower_suggestions.curselection()
+        if sel and not keep:
+            self.borrower_entry.delete(0, tk.END)
+            self.borrower_entry.insert(0, self.borrower_suggestions.get(sel[0]))
+        self.hide_borrower_suggestions()
+        self.borrower_entry.focus_set()
+
     def issue_book(self):
         book_id_label = self.sel_book_id_lbl.cget("text")
         if book_id_label == "-":
@@ -494,6 +705,15 @@ class LibraryApp(tk.Tk):
             messagebox.showwarning("Validation", "Borrower name required.")
             return
 
+        max_loans = LIBRARY_CONFIG['max_active_loans']
+        allowed = self.db.can_borrow(borrower, max_loans)
+        if allowed is None:
+            messagebox.showerror("Error", "Could not check the borrower's loan limit.")
+            return
+        if not allowed:
+            messagebox.showwarning("Loan Limit", f"{borrower} already has {max_loans} books issued.")
+            return
+
         book_id = int(book_id_label)
         book = self.db.get_book_by_id(book_id)
         if not book:
@@ -510,9 +730,14 @@ class LibraryApp(tk.Tk):
         if result:
             self.db.update_book_copies(book_id, book["copies"] - 1)
             self.borrower_entry.delete(0, tk.END)
+            self.hide_borrower_suggestions()
+            self.add_borrower(borrower)
             messagebox.showinfo("Success", f"Book '{book['title']}' issued to {borrower}!")
-            self.refresh_books()
-            self.refresh_issued()
+            self.update_book_rows(dict(book, copies=book["copies"] - 1))
+            self.upsert_rows(self.issued_tree, [self.issue_values({
+                "issue_id": result, "book_id": book_id, "title": book["title"], 
+                "borrower": borrower, "issue_date": issue_date, "return_date": None
+            })])
             self.refresh_dashboard()  # Refresh analytics too
         else:
             messagebox.showerror("Error", "Failed to issue book.")
@@ -540,9 +765,10 @@ class LibraryApp(tk.Tk):
             book = self.db.get_book_by_id(issued_book["book_id"])
             if book:
                 self.db.update_book_copies(book["id"], book["copies"] + 1)
+                self.update_book_rows(dict(book, copies=book["copies"] + 1))
             messagebox.showinfo("Success", "Book returned successfully!")
-            self.refresh_books()
-            self.refresh_issued()
+            self.upsert_rows(self.issued_tree, [self.issue_values(
+                dict(issued_book, return_date=return_date))])
             self.refresh_dashboard()  # Refresh analytics too
         else:
             messagebox.showerror("Error", "Failed to return book.")
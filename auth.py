@@ -1,19 +1,36 @@
 # auth.py
 import hashlib
+import hmac
 import json
 import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from config import AUTH_CONFIG
+
+KDF_PREFIX = "pbkdf2_sha256"
+
+# Module-level so they outlive the Authentication rebuilt by LibraryApp.logout
+_kdf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth-kdf")
+_session_key = secrets.token_bytes(32)
+_session_cache = {}
+_session_lock = threading.Lock()
 
 class Authentication:
     def __init__(self):
         self.users_file = "users.json"
         self.current_user = None
+        self.users_mtime = None
+        self.lock = threading.Lock()
         self.load_users()
     
     def load_users(self):
         if os.path.exists(self.users_file):
             with open(self.users_file, 'r') as f:
                 self.users = json.load(f)
+            self.users_mtime = os.path.getmtime(self.users_file)
         else:
             # Default admin user
             self.users = {
@@ -26,31 +43,103 @@ class Authentication:
             }
             self.save_users()
     
-    def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+    def reload_users_if_changed(self):
+        """Pick up edits to users.json made since it was last read"""
+        if os.path.exists(self.users_file) and os.path.getmtime(self.users_file) != self.users_mtime:
+            try:
+                self.load_users()
+            except (OSError, ValueError) as e:
+                # Keep the users already loaded rather than locking everyone out
+                print(f"❌ Could not reload {self.users_file}: {e}")
+    
+    def hash_password(self, password, salt=None, iterations=None):
+        """Salted PBKDF2-SHA256, stored as prefix$iterations$salt$hash"""
+        salt = salt or secrets.token_hex(16)
+        iterations = iterations or AUTH_CONFIG['kdf_iterations']
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations)
+        return f"{KDF_PREFIX}${iterations}${salt}${digest.hex()}"
+    
+    def verify_password(self, password, stored):
+        """Return (matches, needs_rehash) for a stored hash of any supported format"""
+        if not isinstance(stored, str):
+            return False, False
+        if not stored.startswith(KDF_PREFIX + "$"):
+            # Legacy unsalted SHA-256 entry
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            # Compare bytes: compare_digest rejects non-ASCII str
+            return hmac.compare_digest(legacy.encode(), stored.encode()), True
+
+        try:
+            _, iterations, salt, _ = stored.split("$")
+            iterations = int(iterations)
+            candidate = self.hash_password(password, salt, iterations)
+        except ValueError:
+            # Malformed entry: nothing can match it
+            return False, False
+        matches = hmac.compare_digest(candidate.encode(), stored.encode())
+        return matches, iterations != AUTH_CONFIG['kdf_iterations']
+    
+    def session_proof(self, password):
+        return hmac.new(_session_key, password.encode(), hashlib.sha256).digest()
+    
+    def check_session(self, username, password):
+        """True if this user verified the same password within session_ttl"""
+        with _session_lock:
+            session = _session_cache.get(username)
+        if not session or session['expires'] < time.monotonic():
+            return False
+        # A password change elsewhere invalidates the cached verification
+        if session['stored'] != self.users[username]['password']:
+            return False
+        return hmac.compare_digest(session['proof'], self.session_proof(password))
+    
+    def remember_session(self, username, password):
+        with _session_lock:
+            _session_cache[username] = {
+                'proof': self.session_proof(password),
+                'stored': self.users[username]['password'],
+                'expires': time.monotonic() + AUTH_CONFIG['session_ttl']
+            }
     
     def login(self, username, password):
-        if username in self.users:
-            if self.users[username]['password'] == self.hash_password(password):
-                self.current_user = {
-                    'username': username,
-                    'role': self.users[username]['role'],
-                    'name': self.users[username]['name']
-                }
-                return self.current_user
-        return None
+        with self.lock:
+            self.reload_users_if_changed()
+            if username not in self.users:
+                return None
+
+            if not self.check_session(username, password):
+                matches, needs_rehash = self.verify_password(password, self.users[username]['password'])
+                if not matches:
+                    return None
+                if needs_rehash:
+                    self.users[username]['password'] = self.hash_password(password)
+                    self.save_users()
+
+            self.remember_session(username, password)
+            self.current_user = {
+                'username': username,
+                'role': self.users[username]['role'],
+                'name': self.users[username]['name']
+            }
+            return self.current_user
+    
+    def login_async(self, username, password):
+        """Run login on the KDF worker; returns a Future of the user or None"""
+        return _kdf_executor.submit(self.login, username, password)
     
     def register(self, username, password, name, role='user'):
-        if username not in self.users:
-            self.users[username] = {
-                'password': self.hash_password(password),
-                'role': role,
-                'name': name,
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            self.save_users()
-            return True
-        return False
+        with self.lock:
+            self.reload_users_if_changed()
+            if username not in self.users:
+                self.users[username] = {
+                    'password': self.hash_password(password),
+                    'role': role,
+                    'name': name,
+                    'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                self.save_users()
+                return True
+            return False
     
     def get_current_user(self):
         return self.current_user
@@ -60,4 +149,5 @@ class Authentication:
     
     def save_users(self):
         with open(self.users_file, 'w') as f:
-            json.dump(self.users, f, indent=4)
\ No newline at end of file
+            json.dump(self.users, f, indent=4)
+        self.users_mtime = os.path.getmtime(self.users_file)
\ No newline at end of file
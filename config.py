@@ -5,4 +5,14 @@ DB_CONFIG = {
     'user': 'root',  # Change to your MySQL username
     'password': '14@UGust2003',  # Change to your MySQL password
     'port': 3306
-}
\ No newline at end of file
+}
+
+LIBRARY_CONFIG = {
+    'max_active_loans': 5,  # Per-patron limit on books out at once
+    'borrower_suggestions': 10  # Autocomplete entries shown in Issue Book
+}
+
+AUTH_CONFIG = {
+    'kdf_iterations': 600000,  # PBKDF2-SHA256 rounds; tune per deployment
+    'session_ttl': 900  # Seconds a verified login skips the KDF (e.g. after logout)
+}
@@ -1,9 +1,18 @@
 # database.py
+import sqlite3
+from datetime import datetime
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
 
+
+def normalize_borrower_id(name):
+    """Normalize a free-text borrower name into a registry ID"""
+    return " ".join(name.split()).lower()
+
 class Database:
+    dialect = 'mysql'
+    
     def __init__(self):
         self.config = DB_CONFIG
     
@@ -42,10 +51,209 @@ class Database:
         finally:
             if connection and connection.is_connected():
                 connection.close()
+    
+    def execute_many(self, query, seq_params):
+        """Run one statement for many parameter sets in a single transaction"""
+        connection = None
+        try:
+            connection = self.connect()
+            if connection and connection.is_connected():
+                cursor = connection.cursor()
+                # mysql-connector rewrites INSERT ... VALUES into one multi-row statement
+                cursor.executemany(query, seq_params)
+                connection.commit()
+                result = cursor.rowcount
+                cursor.close()
+                return result
+                
+        except Error as e:
+            print(f"❌ MySQL Query Error: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def transaction(self, work, consistent_snapshot=False):
+        """Run work(cursor) on one connection in one transaction, rolling back on failure"""
+        connection = self.connect()
+        if not connection:
+            return None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            if consistent_snapshot:
+                # Every read in work() sees the database as of this moment
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            else:
+                connection.start_transaction()
+            result = work(cursor)
+            connection.commit()
+            cursor.close()
+            return result
+        except Error as e:
+            connection.rollback()
+            print(f"❌ MySQL Query Error: {e}")
+            return None
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            if connection.is_connected():
+                connection.close()
+
+class SQLiteCursor:
+    """Cursor wrapper applying SQLiteDatabase.translate to every statement"""
+    def __init__(self, db, cursor):
+        self.db = db
+        self.cursor = cursor
+    
+    def execute(self, query, params=None):
+        self.cursor.execute(self.db.translate(query), params or ())
+    
+    def executemany(self, query, seq_params):
+        self.cursor.executemany(self.db.translate(query), seq_params)
+    
+    def fetchall(self):
+        return self.cursor.fetchall()
+    
+    def fetchone(self):
+        return self.cursor.fetchone()
+    
+    @property
+    def description(self):
+        return self.cursor.description
+
+class SQLiteDatabase:
+    """Embedded stand-in for Database, used for tests, snapshots and load runs"""
+    dialect = 'sqlite'
+    
+    def __init__(self, path):
+        # Each query opens its own connection, so path must be a file, not ':memory:'
+        self.path = path
+        self.create_schema()
+    
+    def connect(self):
+        try:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = lambda cursor, row: {
+                col[0]: row[i] for i, col in enumerate(cursor.description)
+            }
+            connection.create_function(
+                "NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            return connection
+        except sqlite3.Error as e:
+            print(f"❌ SQLite Connection Error: {e}")
+            return None
+    
+    def translate(self, query):
+        """Rewrite the MySQL flavour used by LibraryDB into SQLite"""
+        return query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+    
+    def execute_query(self, query, params=None, fetch=False, fetch_one=False):
+        connection = None
+        try:
+            connection = self.connect()
+            if connection:
+                cursor = connection.cursor()
+                cursor.execute(self.translate(query), params or ())
+                
+                if fetch:
+                    result = cursor.fetchall()
+                elif fetch_one:
+                    result = cursor.fetchone()
+                else:
+                    connection.commit()
+                    # Like MySQL: non-INSERT writes give 0, only errors give None
+                    result = cursor.lastrowid or 0
+                
+                cursor.close()
+                return result
+                
+        except sqlite3.Error as e:
+            print(f"❌ SQLite Query Error: {e}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+    
+    def execute_many(self, query, seq_params):
+        connection = None
+        try:
+            connection = self.connect()
+            if connection:
+                cursor = connection.cursor()
+                cursor.executemany(self.translate(query), seq_params)
+                connection.commit()
+                result = cursor.rowcount
+                cursor.close()
+                return result
+                
+        except sqlite3.Error as e:
+            print(f"❌ SQLite Query Error: {e}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+    
+    def transaction(self, work, consistent_snapshot=False):
+        """Run work(cursor) on one connection in one transaction, rolling back on failure"""
+        connection = self.connect()
+        if not connection:
+            return None
+        try:
+            # BEGIN holds one read snapshot for the whole transaction
+            connection.execute("BEGIN")
+            result = work(SQLiteCursor(self, connection.cursor()))
+            connection.commit()
+            return result
+        except sqlite3.Error as e:
+            connection.rollback()
+            print(f"❌ SQLite Query Error: {e}")
+            return None
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+    
+    def create_schema(self):
+        """Create the library tables, mirroring the MySQL schema"""
+        connection = self.connect()
+        if not connection:
+            return
+        try:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS books (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title VARCHAR(255) NOT NULL,
+                    author VARCHAR(255),
+                    year VARCHAR(10),
+                    isbn VARCHAR(50),
+                    copies INTEGER DEFAULT 1
+                );
+                CREATE TABLE IF NOT EXISTS borrowers (
+                    borrower_id VARCHAR(255) PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    created_at DATETIME
+                );
+                CREATE TABLE IF NOT EXISTS issued_books (
+                    issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    book_id INTEGER,
+                    title VARCHAR(255),
+                    borrower VARCHAR(255),
+                    borrower_id VARCHAR(255),
+                    issue_date DATETIME,
+                    return_date DATETIME
+                );
+                CREATE INDEX IF NOT EXISTS idx_issued_borrower_active
+                    ON issued_books (borrower_id, return_date);
+            """)
+        finally:
+            connection.close()
 
 class LibraryDB:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        self.db = db or Database()
+        self.ensure_borrower_registry()
     
     # ===== CORE BOOK OPERATIONS =====
     def get_all_books(self):
@@ -76,7 +284,8 @@ class LibraryDB:
         ORDER BY id
         """
         search_pattern = f"%{search_term}%"
-        return self.db.execute_query(query, (search_pattern, search_pattern, search_pattern), fetch=True) or []
+        # None (not []) on a database error, so callers can tell failure from no match
+        return self.db.execute_query(query, (search_pattern, search_pattern, search_pattern), fetch=True)
     
     # ===== ISSUED BOOKS OPERATIONS =====
     def get_all_issued_books(self):
@@ -85,11 +294,19 @@ class LibraryDB:
         return result or []
     
     def issue_book(self, book_id, title, borrower, issue_date):
+        if not self.borrower_registry:
+            query = """
+            INSERT INTO issued_books (book_id, title, borrower, issue_date, return_date) 
+            VALUES (%s, %s, %s, %s, NULL)
+            """
+            return self.db.execute_query(query, (book_id, title, borrower, issue_date))
+        
+        borrower_id = self.register_borrower(borrower)
         query = """
-        INSERT INTO issued_books (book_id, title, borrower, issue_date, return_date) 
-        VALUES (%s, %s, %s, %s, NULL)
+        INSERT INTO issued_books (book_id, title, borrower, borrower_id, issue_date, return_date) 
+        VALUES (%s, %s, %s, %s, %s, NULL)
         """
-        return self.db.execute_query(query, (book_id, title, borrower, issue_date))
+        return self.db.execute_query(query, (book_id, title, borrower, borrower_id, issue_date))
     
     def return_book(self, issue_id, return_date):
         query = "UPDATE issued_books SET return_date = %s WHERE issue_id = %s"
@@ -99,6 +316,132 @@ class LibraryDB:
         query = "SELECT * FROM issued_books WHERE issue_id = %s"
         return self.db.execute_query(query, (issue_id,), fetch_one=True)
     
+    # ===== BORROWER REGISTRY =====
+    def ensure_borrower_registry(self):
+        """Create the borrower registry and migrate free-text borrowers into it"""
+        # Embedded backends create the registry with their schema
+        self.borrower_registry = self.db.dialect != 'mysql'
+        if self.borrower_registry:
+            return
+        
+        created = self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS borrowers (
+                borrower_id VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                created_at DATETIME
+            )
+        """)
+        column = self.db.execute_query("""
+            SELECT COUNT(*) as count FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'issued_books'
+            AND COLUMN_NAME = 'borrower_id'
+        """, fetch_one=True)
+        if created is None or column is None:
+            print("⚠️ Borrower registry unavailable; issuing books without borrower IDs")
+            return
+        if column['count'] == 0:
+            # (borrower_id, return_date) turns "active loans of a patron" into an index range.
+            # IDs are normalized in Python, so compare them byte-for-byte: "José" != "Jose"
+            altered = self.db.execute_query("""
+                ALTER TABLE issued_books
+                ADD COLUMN borrower_id VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL,
+                ADD INDEX idx_issued_borrower_active (borrower_id, return_date)
+            """)
+            if altered is None:
+                print("⚠️ Could not add issued_books.borrower_id; issuing books without borrower IDs")
+                return
+        
+        self.borrower_registry = True
+        self.migrate_borrowers()
+    
+    def migrate_borrowers(self):
+        """Bulk-migrate issue rows that have no borrower_id yet"""
+        # Same normalization as normalize_borrower_id, done server-side (MySQL 8.0+)
+        normalized = "LOWER(TRIM(REGEXP_REPLACE(borrower, '[[:space:]]+', ' ')))"
+        inserted = self.db.execute_query(f"""
+            INSERT IGNORE INTO borrowers (borrower_id, name, created_at)
+            SELECT {normalized}, MIN(TRIM(REGEXP_REPLACE(borrower, '[[:space:]]+', ' '))), MIN(issue_date)
+            FROM issued_books
+            WHERE borrower_id IS NULL AND TRIM(borrower) != ''
+            GROUP BY {normalized} COLLATE utf8mb4_bin
+        """)
+        updated = self.db.execute_query(f"""
+            UPDATE issued_books SET borrower_id = {normalized}
+            WHERE borrower_id IS NULL AND TRIM(borrower) != ''
+        """) if inserted is not None else None
+        if updated is None:
+            self.migrate_borrowers_client_side()
+    
+    def migrate_borrowers_client_side(self):
+        """Fallback migration normalizing names in Python, one batch per statement"""
+        rows = self.db.execute_query(
+            "SELECT DISTINCT borrower FROM issued_books WHERE borrower_id IS NULL", fetch=True)
+        if rows is None:
+            print("⚠️ Borrower migration failed; loan limits ignore unmigrated issues")
+            return
+        
+        names = [r['borrower'] for r in rows if r['borrower'] and r['borrower'].strip()]
+        if not names:
+            return
+        registry = {normalize_borrower_id(n): " ".join(n.split()) for n in names}
+        inserted = self.db.execute_many("""
+            INSERT IGNORE INTO borrowers (borrower_id, name, created_at) 
+            VALUES (%s, %s, NOW())
+        """, list(registry.items()))
+        updated = self.db.execute_many("""
+            UPDATE issued_books SET borrower_id = %s 
+            WHERE borrower = %s AND borrower_id IS NULL
+        """, [(normalize_borrower_id(n), n) for n in names])
+        if inserted is None or updated is None:
+            print("⚠️ Borrower migration failed; loan limits ignore unmigrated issues")
+    
+    def register_borrower(self, name):
+        """Add a borrower to the registry if missing and return its ID"""
+        borrower_id = normalize_borrower_id(name)
+        query = """
+        INSERT IGNORE INTO borrowers (borrower_id, name, created_at) 
+        VALUES (%s, %s, NOW())
+        """
+        self.db.execute_query(query, (borrower_id, " ".join(name.split())))
+        return borrower_id
+    
+    def get_all_borrowers(self):
+        """Registry sorted by ID, for client-side autocomplete"""
+        if not self.borrower_registry:
+            return []
+        query = "SELECT borrower_id, name FROM borrowers ORDER BY borrower_id"
+        return self.db.execute_query(query, fetch=True) or []
+    
+    def borrower_match(self, borrower):
+        """WHERE clause and parameter selecting one borrower's issue rows"""
+        if self.borrower_registry:
+            return "borrower_id = %s", normalize_borrower_id(borrower)
+        return "borrower = %s", borrower
+    
+    def get_active_loans(self, borrower):
+        """Books a borrower currently has out"""
+        clause, param = self.borrower_match(borrower)
+        query = f"""
+        SELECT * FROM issued_books 
+        WHERE {clause} AND return_date IS NULL 
+        ORDER BY issue_id
+        """
+        return self.db.execute_query(query, (param,), fetch=True) or []
+    
+    def count_active_loans(self, borrower):
+        clause, param = self.borrower_match(borrower)
+        query = f"""
+        SELECT COUNT(*) as count FROM issued_books 
+        WHERE {clause} AND return_date IS NULL
+        """
+        result = self.db.execute_query(query, (param,), fetch_one=True)
+        return result['count'] if result else None
+    
+    def can_borrow(self, borrower, max_active_loans):
+        """Check a patron's loan limit using only their active loans; None on error"""
+        count = self.count_active_loans(borrower)
+        return None if count is None else count < max_active_loans
+    
     # ===== ANALYTICS & REPORTS =====
     def get_library_analytics(self):
         """Get comprehensive library analytics for dashboard"""
@@ -0,0 +1,239 @@
+# loadtest.py
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from database import LibraryDB, SQLiteDatabase
+from config import LIBRARY_CONFIG
+import snapshot
+
+
+class LoadStats:
+    """Latency samples, errors and invariant violations shared by all workers"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.violations = []
+
+    def record(self, op, seconds):
+        with self.lock:
+            self.latencies.setdefault(op, []).append(seconds)
+
+    def error(self, op, message):
+        with self.lock:
+            self.errors.setdefault(op, []).append(message)
+
+    def violation(self, message):
+        with self.lock:
+            self.violations.append(message)
+
+    def timed(self, op, func, *args):
+        """Call a LibraryDB method; None means it hit a database error"""
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as e:
+            result = None
+            self.error(op, repr(e))
+        else:
+            if result is None:
+                self.error(op, "database error (returned None)")
+        self.record(op, time.perf_counter() - start)
+        return result
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_library(library_db, books, copies):
+    """Fill an empty stand-in database with synthetic books"""
+    rows = [(f"Book {i}", f"Author {i % 97}", str(1950 + i % 70), f"978{i:010d}", copies)
+            for i in range(books)]
+    library_db.db.execute_many(
+        "INSERT INTO books (title, author, year, isbn, copies) VALUES (%s, %s, %s, %s, %s)", rows)
+
+
+def circulation_state(library_db):
+    """Per-book copies on the shelf and active loans; None on a database error"""
+    return library_db.db.execute_query("""
+        SELECT b.id, b.copies, COUNT(ib.issue_id) as active
+        FROM books b
+        LEFT JOIN issued_books ib ON ib.book_id = b.id AND ib.return_date IS NULL
+        GROUP BY b.id, b.copies
+    """, fetch=True)
+
+
+def desk_worker(library_db, stats, book_ids, borrowers, think, stop):
+    """Issue and return books the way LibraryApp.issue_book/return_selected do"""
+    my_loans = []
+    while not stop.is_set():
+        time.sleep(random.expovariate(1 / think) if think else 0)
+
+        if my_loans and random.random() < 0.5:
+            issue_id, book_id = my_loans.pop(random.randrange(len(my_loans)))
+            return_date = time.strftime("%Y-%m-%d %H:%M:%S")
+            if stats.timed("return_book", library_db.return_book, issue_id, return_date) is None:
+                my_loans.append((issue_id, book_id))  # Still out; retry later
+                continue
+            book = stats.timed("get_book_by_id", library_db.get_book_by_id, book_id)
+            if book:
+                stats.timed("update_book_copies", library_db.update_book_copies,
+                            book_id, book["copies"] + 1)
+            continue
+
+        borrower = random.choice(borrowers)
+        allowed = stats.timed("can_borrow", library_db.can_borrow,
+                              borrower, LIBRARY_CONFIG['max_active_loans'])
+        if not allowed:
+            continue
+        book_id = random.choice(book_ids)
+        book = stats.timed("get_book_by_id", library_db.get_book_by_id, book_id)
+        if not book or book["copies"] <= 0:
+            continue
+
+        issue_date = time.strftime("%Y-%m-%d %H:%M:%S")
+        issue_id = stats.timed("issue_book", library_db.issue_book,
+                               book_id, book["title"], borrower, issue_date)
+        if not issue_id:
+            continue
+        stats.timed("update_book_copies", library_db.update_book_copies,
+                    book_id, book["copies"] - 1)
+        my_loans.append((issue_id, book_id))
+
+
+def search_worker(library_db, stats, terms, think, stop):
+    while not stop.is_set():
+        time.sleep(random.expovariate(1 / think) if think else 0)
+        stats.timed("search_books", library_db.search_books, random.choice(terms))
+
+
+def monitor_worker(library_db, stats, interval, stop):
+    """Sample for negative copies while the run is in progress"""
+    while not stop.wait(interval):
+        state = circulation_state(library_db)
+        if state is None:
+            stats.error("invariant_check", "sample query failed")
+            continue
+        for row in state:
+            if row["copies"] < 0:
+                stats.violation(f"book {row['id']} has negative copies ({row['copies']})")
+
+
+def run_load(library_db, desks=4, searchers=4, duration=30.0, desk_think=0.2,
+             search_think=0.5, borrowers=200, monitor_interval=1.0):
+    """Run desks and searchers concurrently and return a LoadStats"""
+    stats = LoadStats()
+    state = circulation_state(library_db)
+    if state is None:
+        raise ValueError("Could not read the starting circulation state")
+    # Stock per book = shelf copies + loans already out when the run starts
+    stock = {row["id"]: row["copies"] + row["active"] for row in state}
+    book_ids = list(stock)
+    if not book_ids:
+        raise ValueError("The target library has no books to circulate")
+
+    sample = library_db.db.execute_query(
+        "SELECT title, author FROM books ORDER BY id LIMIT 500", fetch=True) or []
+    terms = [b["title"].split()[0] for b in sample if b["title"]] + \
+            [b["author"] for b in sample if b["author"]]
+    patrons = [f"Patron {n}" for n in range(borrowers)]
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=desk_worker,
+                                args=(library_db, stats, book_ids, patrons, desk_think, stop))
+               for _ in range(desks)]
+    threads += [threading.Thread(target=search_worker,
+                                 args=(library_db, stats, terms or ["Book"], search_think, stop))
+                for _ in range(searchers)]
+    threads.append(threading.Thread(target=monitor_worker,
+                                    args=(library_db, stats, monitor_interval, stop)))
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    stats.elapsed = time.perf_counter() - start
+
+    state = circulation_state(library_db)
+    if state is None:
+        stats.error("invariant_check", "final check query failed")
+        state = []
+    for row in state:
+        if row["copies"] < 0:
+            stats.violation(f"book {row['id']} ends with negative copies ({row['copies']})")
+        if row["copies"] + row["active"] != stock.get(row["id"], row["copies"] + row["active"]):
+            stats.violation(f"book {row['id']} out of sync: {row['copies']} copies + "
+                            f"{row['active']} active loans != stock {stock[row['id']]}")
+    return stats
+
+
+def print_report(stats):
+    total = sum(len(samples) for samples in stats.latencies.values())
+    print(f"📊 {total} operations in {stats.elapsed:.1f}s ({total / stats.elapsed:.1f} ops/s)")
+    print(f"{'Operation':<20}{'Count':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Errors':>8}")
+    for op in sorted(stats.latencies):
+        samples = stats.latencies[op]
+        print(f"{op:<20}{len(samples):>8}{len(samples) / stats.elapsed:>9.1f}"
+              f"{percentile(samples, 50) * 1000:>9.1f}{percentile(samples, 95) * 1000:>9.1f}"
+              f"{percentile(samples, 99) * 1000:>9.1f}{len(stats.errors.get(op, [])):>8}")
+
+    for op, messages in stats.errors.items():
+        print(f"❌ {op}: {len(messages)} errors, first: {messages[0]}")
+    if stats.violations:
+        print(f"❌ {len(stats.violations)} invariant violations")
+        for message in stats.violations[:20]:
+            print(f"   {message}")
+    elif "invariant_check" in stats.errors:
+        print("⚠️ No invariant violations found, but some checks failed to run")
+    else:
+        print("✅ No invariant violations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent circulation-desk load test")
+    parser.add_argument("--desks", type=int, default=4)
+    parser.add_argument("--searchers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--desk-think", type=float, default=0.2, help="Mean desk think time (s)")
+    parser.add_argument("--search-think", type=float, default=0.5, help="Mean search think time (s)")
+    parser.add_argument("--borrowers", type=int, default=200)
+    parser.add_argument("--sqlite", help="Stand-in SQLite file (default: a temporary file)")
+    parser.add_argument("--snapshot", help="Load this snapshot into the stand-in first")
+    parser.add_argument("--books", type=int, default=1000, help="Synthetic books to seed")
+    parser.add_argument("--copies", type=int, default=3, help="Copies per synthetic book")
+    parser.add_argument("--mysql", action="store_true",
+                        help="Target the configured MySQL database instead (it will be written to)")
+    args = parser.parse_args()
+
+    if args.mysql:
+        library_db = LibraryDB()
+    else:
+        path = args.sqlite or os.path.join(tempfile.mkdtemp(), "loadtest.db")
+        if args.snapshot:
+            # Keep the real user store untouched
+            users_file = os.path.join(os.path.dirname(os.path.abspath(path)), "loadtest_users.json")
+            library_db, _ = snapshot.load_embedded(args.snapshot, path, users_file)
+        else:
+            library_db = LibraryDB(SQLiteDatabase(path))
+            if not library_db.get_book_by_id(1):
+                seed_library(library_db, args.books, args.copies)
+        print(f"🗄️  Stand-in database: {path}")
+
+    stats = run_load(library_db, args.desks, args.searchers, args.duration,
+                     args.desk_think, args.search_think, args.borrowers)
+    print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# snapshot.py
+import argparse
+import itertools
+import json
+import os
+import struct
+import zlib
+from database import LibraryDB, SQLiteDatabase
+
+# File layout (all integers big-endian):
+#   header    MAGIC, format version (H)
+#   table     manifest length (I), JSON manifest {"name", "columns"}
+#   chunk     row count (I), payload length (I), CRC32 of raw payload (I), zlib payload
+#   end       a chunk with row count 0 closes a table; a manifest length 0 closes the file
+# Chunk payloads are columnar: a JSON list holding one value list per column.
+MAGIC = b"LMSSNAP\0"
+FORMAT_VERSION = 1
+CHUNK_ROWS = 10000
+
+# (table, key column) in restore order; the key drives keyset pagination on dump
+TABLES = [
+    ('books', 'id'),
+    ('borrowers', 'borrower_id'),
+    ('issued_books', 'issue_id'),
+]
+USERS_TABLE = 'users'
+
+
+def _iter_table_chunks(cursor, table, key):
+    """Yield a table in CHUNK_ROWS pages without OFFSET scans"""
+    last = None
+    while True:
+        if last is None:
+            cursor.execute(f"SELECT * FROM {table} ORDER BY {key} LIMIT %s", (CHUNK_ROWS,))
+        else:
+            cursor.execute(f"SELECT * FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s",
+                           (last, CHUNK_ROWS))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][key]
+
+
+def _write_table(f, name, columns, chunks):
+    manifest = json.dumps({'name': name, 'columns': columns}).encode()
+    f.write(struct.pack(">I", len(manifest)))
+    f.write(manifest)
+
+    total = 0
+    for rows in chunks:
+        payload = json.dumps([[row[c] for row in rows] for c in columns], default=str).encode()
+        compressed = zlib.compress(payload, 6)
+        f.write(struct.pack(">III", len(rows), len(compressed), zlib.crc32(payload)))
+        f.write(compressed)
+        total += len(rows)
+    f.write(struct.pack(">III", 0, 0, 0))
+    return total
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Snapshot is truncated")
+    return data
+
+
+def read_snapshot(path):
+    """Yield (table, columns, rows) per chunk, verifying every checksum"""
+    with open(path, 'rb') as f:
+        if _read_exact(f, len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a library snapshot")
+        version, = struct.unpack(">H", _read_exact(f, 2))
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Snapshot format {version} is newer than supported ({FORMAT_VERSION})")
+
+        while True:
+            manifest_len, = struct.unpack(">I", _read_exact(f, 4))
+            if manifest_len == 0:
+                return
+            try:
+                manifest = json.loads(_read_exact(f, manifest_len))
+                table, columns = manifest['name'], manifest['columns']
+            except (ValueError, KeyError, TypeError):
+                raise ValueError("Snapshot table manifest is corrupt")
+            # Announce every table, even one without rows
+            yield table, columns, []
+
+            while True:
+                row_count, size, crc = struct.unpack(">III", _read_exact(f, 12))
+                if row_count == 0:
+                    break
+                # json and UnicodeDecodeError are ValueErrors; zlib has its own
+                try:
+                    payload = zlib.decompress(_read_exact(f, size))
+                    if zlib.crc32(payload) != crc:
+                        raise ValueError("checksum mismatch")
+                    rows = list(zip(*json.loads(payload)))
+                except (zlib.error, ValueError, TypeError):
+                    raise ValueError(f"Snapshot chunk in table '{table}' is corrupt")
+                if len(rows) != row_count:
+                    raise ValueError(f"Snapshot chunk in table '{table}' is corrupt")
+                yield table, columns, rows
+
+
+def dump_snapshot(library_db, path, users_file="users.json"):
+    """Write books, borrowers, issued_books and the user store to a snapshot"""
+    # One transaction keeps every table at the same moment while desks keep writing
+    tmp_path = path + ".tmp"
+
+    def dump(cursor):
+        counts = {}
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack(">H", FORMAT_VERSION))
+
+            for table, key in TABLES:
+                chunks = _iter_table_chunks(cursor, table, key)
+                first = next(chunks, None)
+                if first is None:
+                    counts[table] = _write_table(f, table, [], [])
+                    continue
+                columns = list(first[0].keys())
+                counts[table] = _write_table(f, table, columns, itertools.chain([first], chunks))
+
+            users = {}
+            if os.path.exists(users_file):
+                with open(users_file, 'r') as uf:
+                    users = json.load(uf)
+            fields = sorted({field for user in users.values() for field in user})
+            user_rows = [dict(user, username=username) for username, user in users.items()]
+            user_rows = [{c: row.get(c) for c in ['username'] + fields} for row in user_rows]
+            counts[USERS_TABLE] = _write_table(
+                f, USERS_TABLE, ['username'] + fields, [user_rows] if user_rows else [])
+
+            f.write(struct.pack(">I", 0))
+        return counts
+
+    try:
+        counts = library_db.db.transaction(dump, consistent_snapshot=True)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if counts is None:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ValueError("Snapshot dump failed")
+    os.replace(tmp_path, path)
+    return counts
+
+
+def restore_snapshot(library_db, path, users_file="users.json"):
+    """Replace the library contents with a snapshot using bulk inserts"""
+    # Delete and inserts share one transaction, so a corrupt chunk rolls everything back
+    users = {}
+
+    def restore(cursor):
+        # Names in the file are untrusted: only known tables and their real columns
+        known = {}
+        for table, _ in TABLES:
+            cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+            known[table] = {d[0] for d in cursor.description}
+            cursor.fetchall()
+        known[USERS_TABLE] = None  # users.json has free-form fields
+
+        # Clear children before parents so foreign keys never dangle
+        for table, _ in reversed(TABLES):
+            cursor.execute(f"DELETE FROM {table}")
+
+        counts = {}
+        for table, columns, rows in read_snapshot(path):
+            if table not in known:
+                raise ValueError(f"Snapshot contains unknown table '{table}'")
+            unknown = set(columns) - known[table] if known[table] is not None else set()
+            if unknown:
+                raise ValueError(f"Snapshot table '{table}' has unknown columns: {sorted(unknown)}")
+            counts[table] = counts.get(table, 0) + len(rows)
+            if not rows:
+                continue
+            if table == USERS_TABLE:
+                if 'username' not in columns:
+                    raise ValueError("Snapshot users table has no username column")
+                for row in rows:
+                    user = dict(zip(columns, row))
+                    username = user.pop('username')
+                    users[username] = {k: v for k, v in user.items() if v is not None}
+                continue
+
+            query = "INSERT INTO {} ({}) VALUES ({})".format(
+                table, ", ".join(columns), ", ".join(["%s"] * len(columns)))
+            cursor.executemany(query, rows)
+
+        missing = [table for table, _ in TABLES if table not in counts]
+        if missing:
+            raise ValueError(f"Snapshot is missing tables: {missing}")
+        return counts
+
+    counts = library_db.db.transaction(restore)
+    if counts is None:
+        raise ValueError("Snapshot restore failed; the library was left unchanged")
+
+    if users:
+        with open(users_file, 'w') as f:
+            json.dump(users, f, indent=4)
+    return counts
+
+
+def load_embedded(path, sqlite_path, users_file="users.json"):
+    """Load a snapshot into a fresh embedded SQLite library"""
+    library_db = LibraryDB(SQLiteDatabase(sqlite_path))
+    counts = restore_snapshot(library_db, path, users_file)
+    return library_db, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore the library")
+    parser.add_argument("action", choices=["dump", "restore"])
+    parser.add_argument("path", help="Snapshot file")
+    parser.add_argument("--sqlite", help="Use an embedded SQLite file instead of MySQL")
+    parser.add_argument("--users", default="users.json", help="User store to dump or restore")
+    args = parser.parse_args()
+
+    db = SQLiteDatabase(args.sqlite) if args.sqlite else None
+    library_db = LibraryDB(db)
+    if args.action == "dump":
+        counts = dump_snapshot(library_db, args.path, args.users)
+    else:
+        counts = restore_snapshot(library_db, args.path, args.users)
+
+    for table, count in counts.items():
+        print(f"✅ {table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
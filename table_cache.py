@@ -0,0 +1,121 @@
+# table_cache.py
+import bisect
+import math
+import re
+
+# Plain decimal numbers only; float() would also accept "NaN", "inf" and "1_000"
+NUMBER = re.compile(r"-?\d+(\.\d+)?")
+
+
+def sort_key(value):
+    """Comparable key: blanks first, then numbers, then case-insensitive text"""
+    if value is None or value == "":
+        return (0, 0, "")
+    number = None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str) and NUMBER.fullmatch(value.strip()):
+        number = float(value)
+    if number is not None and math.isfinite(number):
+        return (1, number, "")
+    return (2, 0, str(value).casefold())
+
+
+class ColumnCache:
+    """Client-side columnar copy of a Treeview's rows for local sort and filter"""
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.clear()
+    
+    def clear(self):
+        self.data = {c: [] for c in self.columns}
+        self.sort_keys = {c: [] for c in self.columns}
+        self.text = []  # Lower-cased row text for the quick filter
+        self.positions = {}  # First column (the row key) -> row position
+        self.orders = {}  # Column -> sorted (sort key, row position) pairs
+    
+    def __len__(self):
+        return len(self.text)
+    
+    def load(self, rows):
+        """Replace the cache with rows of values in column order"""
+        self.clear()
+        for values in rows:
+            self._append(values)
+    
+    def _append(self, values):
+        pos = len(self.text)
+        for c, value in zip(self.columns, values):
+            self.data[c].append(value)
+            self.sort_keys[c].append(sort_key(value))
+        self.text.append(" ".join(str(v) for v in values).casefold())
+        self.positions[values[0]] = pos
+        return pos
+    
+    def upsert(self, values):
+        """Insert or replace one row, keeping computed sort orders valid"""
+        key = values[0]
+        pos = self.positions.get(key)
+        if pos is None:
+            pos = self._append(values)
+            for c, order in self.orders.items():
+                bisect.insort(order, (self.sort_keys[c][pos], pos))
+            return
+        
+        for c, value in zip(self.columns, values):
+            new_key = sort_key(value)
+            self.data[c][pos] = value
+            old_key = self.sort_keys[c][pos]
+            self.sort_keys[c][pos] = new_key
+            if new_key != old_key and c in self.orders:
+                order = self.orders[c]
+                del order[bisect.bisect_left(order, (old_key, pos))]
+                bisect.insort(order, (new_key, pos))
+        self.text[pos] = " ".join(str(v) for v in values).casefold()
+    
+    def update(self, values):
+        """Upsert only if the row is already cached; returns whether it was"""
+        if values[0] not in self.positions:
+            return False
+        self.upsert(values)
+        return True
+    
+    def sorted_pairs(self, column):
+        if column not in self.orders:
+            self.orders[column] = sorted((k, p) for p, k in enumerate(self.sort_keys[column]))
+        return self.orders[column]
+    
+    def order(self, column):
+        return [p for _, p in self.sorted_pairs(column)]
+    
+    def view(self, sort_column=None, descending=False, filter_text=""):
+        """Rows as value tuples, filtered by substring and sorted by one column"""
+        positions = self.order(sort_column) if sort_column else range(len(self.text))
+        if descending:
+            positions = reversed(positions)
+        needle = filter_text.strip().casefold()
+        if needle:
+            positions = [p for p in positions if needle in self.text[p]]
+        return [tuple(self.data[c][p] for c in self.columns) for p in positions]
+    
+    def view_index(self, key, sort_column=None, descending=False, filter_text=""):
+        """Index of a row within the matching view(), or None if it is filtered out"""
+        pos = self.positions.get(key)
+        if pos is None:
+            return None
+        needle = filter_text.strip().casefold()
+        if needle and needle not in self.text[pos]:
+            return None
+        
+        if sort_column:
+            order = self.sorted_pairs(sort_column)
+            i = bisect.bisect_left(order, (self.sort_keys[sort_column][pos], pos))
+            if not needle:
+                return len(order) - 1 - i if descending else i
+            preceding = (p for _, p in (order[i + 1:] if descending else order[:i]))
+        else:
+            if not needle:
+                return len(self.text) - 1 - pos if descending else pos
+            preceding = range(pos + 1, len(self.text)) if descending else range(pos)
+        # With a filter, only the visible rows ahead of this one count
+        return sum(1 for p in preceding if needle in self.text[p])
\ No newline at end of file
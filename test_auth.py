@@ -0,0 +1,85 @@
+# test_auth.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import auth
+
+
+class AuthenticationTest(unittest.TestCase):
+    def setUp(self):
+        # Authentication reads users.json from the working directory
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.config = dict(auth.AUTH_CONFIG)
+        auth.AUTH_CONFIG['kdf_iterations'] = 1000
+        auth._session_cache.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+        auth.AUTH_CONFIG.update(self.config)
+        auth._session_cache.clear()
+
+    def write_users(self, **passwords):
+        users = {name: {'password': stored, 'role': 'user', 'name': name.title(),
+                        'created_at': '2025-10-16 20:59:28'}
+                 for name, stored in passwords.items()}
+        with open("users.json", 'w') as f:
+            json.dump(users, f)
+
+    def stored(self, username):
+        with open("users.json") as f:
+            return json.load(f)[username]['password']
+
+    def test_legacy_hash_rehashed_on_login(self):
+        self.write_users(ann=hashlib.sha256(b"secret").hexdigest())
+        a = auth.Authentication()
+        self.assertIsNone(a.login('ann', 'wrong'))
+        self.assertFalse(self.stored('ann').startswith(auth.KDF_PREFIX))
+
+        self.assertEqual(a.login('ann', 'secret')['username'], 'ann')
+        self.assertTrue(self.stored('ann').startswith(auth.KDF_PREFIX + "$1000$"))
+        auth._session_cache.clear()
+        self.assertIsNotNone(auth.Authentication().login('ann', 'secret'))
+
+    def test_cost_change_rehashes(self):
+        a = auth.Authentication()
+        self.write_users(ann=a.hash_password('secret'))
+        auth.AUTH_CONFIG['kdf_iterations'] = 2000
+        self.assertIsNotNone(auth.Authentication().login('ann', 'secret'))
+        self.assertTrue(self.stored('ann').startswith(auth.KDF_PREFIX + "$2000$"))
+
+    def test_malformed_entries_fail(self):
+        a = auth.Authentication()
+        for stored in ("pbkdf2_sha256$x$y", "pbkdf2_sha256$abc$salt$00", "é", "pbkdf2_sha256$é$s$h",
+                       None, 42):
+            self.assertFalse(a.verify_password('x', stored)[0], stored)
+        self.write_users(bad="pbkdf2_sha256$1000$salté$00")
+        self.assertIsNone(auth.Authentication().login('bad', 'x'))
+
+    def test_session_cache_skips_kdf(self):
+        self.write_users(ann=auth.Authentication().hash_password('secret'))
+        self.assertIsNotNone(auth.Authentication().login('ann', 'secret'))
+
+        # A restarted app reuses the verification without deriving again
+        with mock.patch.object(auth.Authentication, 'verify_password') as verify:
+            self.assertIsNotNone(auth.Authentication().login('ann', 'secret'))
+            verify.assert_not_called()
+        # A different password still goes through the KDF and fails
+        self.assertIsNone(auth.Authentication().login('ann', 'other'))
+
+    def test_password_change_invalidates_session(self):
+        a = auth.Authentication()
+        self.write_users(ann=a.hash_password('secret'))
+        self.assertIsNotNone(auth.Authentication().login('ann', 'secret'))
+        self.write_users(ann=a.hash_password('changed'))
+        self.assertIsNone(auth.Authentication().login('ann', 'secret'))
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
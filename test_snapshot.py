@@ -0,0 +1,110 @@
+# test_snapshot.py
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import snapshot
+from database import LibraryDB, SQLiteDatabase
+
+USERS = {
+    'admin': {'password': 'pbkdf2_sha256$1$salt$00', 'role': 'admin',
+              'name': 'System Administrator', 'created_at': '2025-10-16 20:59:28'},
+    'desk': {'password': 'pbkdf2_sha256$1$salt$11', 'role': 'user',
+             'name': 'Front Desk', 'created_at': '2025-10-17 09:00:00'}
+}
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.users_file = self.path("users.json")
+        with open(self.users_file, 'w') as f:
+            json.dump(USERS, f)
+
+        self.source = LibraryDB(SQLiteDatabase(self.path("source.db")))
+        for i in range(25):
+            self.source.add_book(f"Book {i}", f"Author {i % 4}", "1999", f"isbn-{i}", 2)
+        self.source.issue_book(1, "Book 0", "Ann Lee", "2025-01-01 10:00:00")
+        self.source.issue_book(2, "Book 1", "José", "2025-01-02 10:00:00")
+        self.source.return_book(1, "2025-01-05 10:00:00")
+
+        self.snapshot = self.path("library.snap")
+        snapshot.dump_snapshot(self.source, self.snapshot, self.users_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def state(self, library_db):
+        return (library_db.get_all_books(), library_db.get_all_issued_books(),
+                library_db.get_all_borrowers())
+
+    def restored_library(self):
+        library_db, _ = snapshot.load_embedded(self.snapshot, self.path("target.db"),
+                                               self.path("restored_users.json"))
+        return library_db
+
+    def write_snapshot(self, tables):
+        """Hand-build a snapshot from (name, columns, rows) tables"""
+        path = self.path("custom.snap")
+        with open(path, 'wb') as f:
+            f.write(snapshot.MAGIC)
+            f.write(struct.pack(">H", snapshot.FORMAT_VERSION))
+            for name, columns, rows in tables:
+                snapshot._write_table(f, name, columns, [rows] if rows else [])
+            f.write(struct.pack(">I", 0))
+        return path
+
+    def assert_restore_rejected(self, path):
+        target = self.restored_library()
+        before = self.state(target)
+        with self.assertRaises(ValueError):
+            snapshot.restore_snapshot(target, path, self.path("restored_users.json"))
+        self.assertEqual(self.state(target), before)
+
+    def test_round_trip(self):
+        target = self.restored_library()
+        self.assertEqual(self.state(target), self.state(self.source))
+        with open(self.path("restored_users.json")) as f:
+            self.assertEqual(json.load(f), USERS)
+
+    def test_checksum_error_leaves_target_unchanged(self):
+        data = bytearray(open(self.snapshot, 'rb').read())
+        data[data.rfind(b"issued_books") + 80] ^= 0xFF
+        corrupt = self.path("corrupt.snap")
+        open(corrupt, 'wb').write(data)
+        self.assert_restore_rejected(corrupt)
+
+    def test_truncation_leaves_target_unchanged(self):
+        truncated = self.path("truncated.snap")
+        open(truncated, 'wb').write(open(self.snapshot, 'rb').read()[:-40])
+        self.assert_restore_rejected(truncated)
+
+    def test_unknown_table_rejected(self):
+        path = self.write_snapshot([('sqlite_sequence', ['name', 'seq'], [{'name': 'books', 'seq': 1}])])
+        self.assert_restore_rejected(path)
+
+    def test_unknown_column_rejected(self):
+        books = [{'id': 1, 'title': 'T', 'rating': 5}]
+        path = self.write_snapshot([('books', ['id', 'title', 'rating'], books),
+                                    ('borrowers', [], []), ('issued_books', [], [])])
+        self.assert_restore_rejected(path)
+
+    def test_missing_table_rejected(self):
+        books = [{'id': 1, 'title': 'T', 'author': 'A', 'year': '1999', 'isbn': 'x', 'copies': 1}]
+        path = self.write_snapshot([('books', list(books[0]), books)])
+        self.assert_restore_rejected(path)
+
+    def test_empty_tables_restore(self):
+        path = self.write_snapshot([('books', [], []), ('borrowers', [], []), ('issued_books', [], [])])
+        target = self.restored_library()
+        snapshot.restore_snapshot(target, path, self.path("restored_users.json"))
+        self.assertEqual(self.state(target), ([], [], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
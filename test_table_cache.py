@@ -0,0 +1,106 @@
+# test_table_cache.py
+import random
+import unittest
+from table_cache import ColumnCache, sort_key
+
+
+def expected_view(rows, columns, sort_column=None, descending=False, filter_text=""):
+    """Brute-force reference for ColumnCache.view"""
+    result = list(rows.values())
+    if sort_column:
+        index = columns.index(sort_column)
+        result.sort(key=lambda r: sort_key(r[index]), reverse=descending)
+    needle = filter_text.strip().casefold()
+    if needle:
+        result = [r for r in result if needle in " ".join(str(v) for v in r).casefold()]
+    return result
+
+
+class SortKeyTest(unittest.TestCase):
+    def test_numbers_sort_numerically(self):
+        self.assertLess(sort_key("9"), sort_key("10"))
+        self.assertLess(sort_key(2), sort_key("10.5"))
+
+    def test_blanks_first_text_last(self):
+        self.assertLess(sort_key(None), sort_key(0))
+        self.assertLess(sort_key(""), sort_key("-3"))
+        self.assertLess(sort_key(10 ** 6), sort_key("Austen"))
+
+    def test_special_floats_are_text(self):
+        for value in ("NaN", "nan", "inf", "-Infinity", "1_000", "1" * 400, float("nan")):
+            self.assertEqual(sort_key(value)[0], 2, value)
+
+
+class ColumnCacheTest(unittest.TestCase):
+    columns = ["ID", "Title", "Copies"]
+
+    def test_view_sorts_and_filters(self):
+        cache = ColumnCache(self.columns)
+        cache.load([(1, "Emma", 3), (2, "dune", 10), (3, "Beloved", 0)])
+        self.assertEqual([r[1] for r in cache.view("Title")], ["Beloved", "dune", "Emma"])
+        self.assertEqual([r[2] for r in cache.view("Copies", descending=True)], [10, 3, 0])
+        self.assertEqual(cache.view("ID", filter_text=" DUNE "), [(2, "dune", 10)])
+
+    def test_upsert_updates_existing_row(self):
+        cache = ColumnCache(self.columns)
+        cache.load([(1, "Emma", 3), (2, "Dune", 1)])
+        cache.view("Copies")
+        cache.upsert((1, "Emma", 0))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.view("Copies"), [(1, "Emma", 0), (2, "Dune", 1)])
+
+    def test_update_ignores_unknown_rows(self):
+        cache = ColumnCache(self.columns)
+        cache.load([(1, "Emma", 3)])
+        self.assertFalse(cache.update((2, "Dune", 1)))
+        self.assertTrue(cache.update((1, "Emma", 2)))
+        self.assertEqual(cache.view(), [(1, "Emma", 2)])
+
+    def test_random_upserts_match_reference(self):
+        rng = random.Random(1234)
+        values = ["NaN", "inf", "", None, "Dune", "dune", "Emma", "7", "10", 3, 3.5, "1_000"]
+        for _ in range(300):
+            cache = ColumnCache(self.columns)
+            rows = {i: (i, rng.choice(values), rng.choice(values)) for i in range(rng.randint(0, 12))}
+            cache.load(list(rows.values()))
+            # Build orders first so upserts must maintain them incrementally
+            cache.view("Title")
+            cache.view("Copies")
+            for _ in range(10):
+                row = (rng.randint(0, 15), rng.choice(values), rng.choice(values))
+                rows[row[0]] = row
+                cache.upsert(row)
+            for column in self.columns:
+                for descending in (False, True):
+                    actual = cache.view(column, descending)
+                    expected = expected_view(rows, self.columns, column, descending)
+                    self.assertEqual(sorted(map(repr, actual)), sorted(map(repr, rows.values())))
+                    self.assertEqual([sort_key(r[self.columns.index(column)]) for r in actual],
+                                     [sort_key(r[self.columns.index(column)]) for r in expected])
+            self.assertEqual(sorted(map(repr, cache.view(filter_text="dune"))),
+                             sorted(map(repr, expected_view(rows, self.columns, filter_text="dune"))))
+
+    def test_view_index_matches_view(self):
+        rng = random.Random(99)
+        values = ["Dune", "dune", "Emma", "7", "10", "", None, 3]
+        for _ in range(200):
+            cache = ColumnCache(self.columns)
+            cache.load([(i, rng.choice(values), rng.choice(values)) for i in range(rng.randint(0, 10))])
+            sort_column = rng.choice([None] + self.columns)
+            descending = rng.random() < 0.5
+            filter_text = rng.choice(["", "dune", "1"])
+            # Mirror LibraryApp.upsert_rows on a list standing in for the Treeview
+            shown = cache.view(sort_column, descending, filter_text)
+            for _ in range(10):
+                row = (rng.randint(0, 12), rng.choice(values), rng.choice(values))
+                cache.upsert(row)
+                shown = [r for r in shown if r[0] != row[0]]
+                index = cache.view_index(row[0], sort_column, descending, filter_text)
+                if index is not None:
+                    shown.insert(index, row)
+                self.assertEqual(shown, cache.view(sort_column, descending, filter_text))
+        self.assertIsNone(ColumnCache(self.columns).view_index(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file